@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# End-to-end load test: starts the FastAPI app (uvicorn) against a local datalake stub and replays
+# harvester-like traffic (data.europa uses ListRecords, the Italian portal uses /dcatapit).
+# Example: python loadtest.py --concurrency 1,8,32 --duration 20 --latency-ms 150 --json summary.json
+
+# Dataset ids known by the real datalake (see ACCRUAL_PERIODICITY in utils.py)
+KNOWN_DATASET_IDS = ["blue-tongue", "iot-animal", "pasture", "pi", "pi-long-term", "thi", "iot-environmental"]
+
+# Default traffic mix, weights are relative
+DEFAULT_MIX = "listrecords=5,dataset=3,dcatapit=2"
+
+STUB_PATH = "/api/v2/datasets"
+
+
+# Build a dataset entry shaped like the datalake response, description padded to roughly payload_bytes
+def make_dataset(dataset_id, payload_bytes):
+    description = f"Synthetic dataset {dataset_id} generated by the load test stub. "
+    if payload_bytes > len(description):
+        description = (description * (payload_bytes // len(description) + 1))[:payload_bytes]
+    return {
+        "metadata": {
+            "id": dataset_id,
+            "label": f"Dataset {dataset_id}",
+            "description": description,
+            "publication_date": "2024-01-01",
+            "contact": {
+                "name": "CMCC Foundation",
+                "email": "dds-support@cmcc.it",
+                "webpage": "https://www.cmcc.it",
+            },
+        },
+        "products": {"monthly": {"description": f"Monthly product of {dataset_id}"}},
+    }
+
+
+# Datalake stub, serves the dataset list and single datasets after a configurable delay
+class DatalakeStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, datasets, latency_ms):
+        self.latency = latency_ms / 1000
+        self.list_body = json.dumps(datasets).encode("utf-8")
+        self.dataset_bodies = {
+            d["metadata"]["id"]: json.dumps(d).encode("utf-8") for d in datasets
+        }
+        super().__init__(("127.0.0.1", 0), DatalakeStubHandler)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}{STUB_PATH}"
+
+
+class DatalakeStubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == STUB_PATH:
+            body = self.server.list_body
+        else:
+            body = self.server.dataset_bodies.get(path[len(STUB_PATH) + 1:])
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Keep the stub quiet, the app logs are enough
+    def log_message(self, format, *args):
+        pass
+
+
+# Parse "listrecords=5,dataset=3,dcatapit=2" into a dict of weights
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in ("listrecords", "dataset", "dcatapit"):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# Build the request path for one endpoint of the mix
+def request_path(endpoint, dataset_ids, rng):
+    if endpoint == "listrecords":
+        return "/oai?verb=ListRecords&metadataPrefix=dcat_ap"
+    if endpoint == "dataset":
+        return f"/oai/{rng.choice(dataset_ids)}?verb=ListRecords"
+    return "/dcatapit"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Start the app with uvicorn as a separate process, so its RSS can be measured on its own
+def start_app(port, workers, datalake_url):
+    env = dict(os.environ, DATALAKE_URL=datalake_url)
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    process = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/openapi.json", timeout=1).raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready in 30 seconds")
+
+
+def is_spawned_worker(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"spawn_main" in f.read()
+    except OSError:
+        return False
+
+
+# Resident set size of a process in MB, read from /proc (Linux only, None elsewhere)
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# Worker processes of the app: children of the uvicorn process started through multiprocessing spawn
+# (this skips helpers such as the resource tracker), or the process itself with a single worker
+def worker_pids(pid):
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return [pid]
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name can contain spaces, ppid is the second field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid and is_spawned_worker(entry):
+            children.append(int(entry))
+    return children or [pid]
+
+
+# Samples the peak RSS of every worker in a background thread while a level runs
+class RSSSampler(threading.Thread):
+    def __init__(self, pid, interval=0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peaks = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.sample()
+            self.stopped.wait(self.interval)
+        self.sample()
+
+    def sample(self):
+        for pid in worker_pids(self.pid):
+            rss = rss_mb(pid)
+            if rss is not None:
+                self.peaks[pid] = max(rss, self.peaks.get(pid, 0))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(results, elapsed):
+    latencies = sorted(latency for latency, ok in results)
+    errors = sum(1 for latency, ok in results if not ok)
+    return {
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": errors / len(results) if results else 0.0,
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+# Run one concurrency level for a fixed duration, returns per-endpoint results
+async def run_level(base_url, mix, concurrency, duration, dataset_ids, timeout, seed):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: [] for name in names}
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def harvester(worker_id):
+            rng = random.Random(seed + worker_id)
+            while time.perf_counter() < deadline:
+                endpoint = rng.choices(names, weights)[0]
+                path = request_path(endpoint, dataset_ids, rng)
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                results[endpoint].append(((time.perf_counter() - start) * 1000, ok))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(harvester(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_level(level):
+    rss = level["rss_mb"]
+    print(f"\nconcurrency={level['concurrency']}  requests={level['requests']}  "
+          f"throughput={level['throughput_rps']:.1f} req/s  errors={level['error_rate']:.2%}  "
+          f"worker RSS peak={format_ms(rss['peak_per_worker'])} MB (total {format_ms(rss['peak_total'])} MB)")
+    print(f"  {'endpoint':<12} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>7}")
+    for name, stats in list(level["endpoints"].items()) + [("all", level)]:
+        latency = stats["latency_ms"]
+        print(f"  {name:<12} {stats['requests']:>6} {format_ms(latency['p50']):>9} "
+              f"{format_ms(latency['p95']):>9} {format_ms(latency['p99']):>9} {stats['error_rate']:>7.2%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay harvester traffic against the app and a local datalake stub")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        help="comma separated concurrency levels, run one after the other (default: 1,8,32)")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level (default: 20)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--latency-ms", type=float, default=100, help="datalake stub latency per request (default: 100)")
+    parser.add_argument("--datasets", type=int, default=len(KNOWN_DATASET_IDS),
+                        help="number of datasets served by the stub (default: 7)")
+    parser.add_argument("--payload-kb", type=float, default=1,
+                        help="approximate size of each dataset description in KB (default: 1)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (default: 1)")
+    parser.add_argument("--timeout", type=float, default=60, help="client timeout per request in seconds (default: 60)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the request mix (default: 0)")
+    parser.add_argument("--json", dest="json_path", help="write a machine-readable summary to this file")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    dataset_ids = KNOWN_DATASET_IDS[:args.datasets] + [
+        f"dataset-{i}" for i in range(len(KNOWN_DATASET_IDS), args.datasets)
+    ]
+    datasets = [make_dataset(dataset_id, int(args.payload_kb * 1024)) for dataset_id in dataset_ids]
+
+    stub = DatalakeStub(datasets, args.latency_ms)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    port = free_port()
+    app = start_app(port, args.workers, stub.base_url)
+
+    summary = {
+        "revision": git_revision(),
+        "config": {
+            "concurrency": levels,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "stub_latency_ms": args.latency_ms,
+            "datasets": args.datasets,
+            "payload_kb": args.payload_kb,
+            "workers": args.workers,
+        },
+        "levels": [],
+    }
+    try:
+        for concurrency in levels:
+            sampler = RSSSampler(app.pid)
+            sampler.start()
+            results, elapsed = asyncio.run(run_level(f"http://127.0.0.1:{port}", args.mix, concurrency,
+                                                     args.duration, dataset_ids, args.timeout, args.seed))
+            sampler.stop()
+
+            level = {"concurrency": concurrency, "duration_s": elapsed}
+            level.update(summarize([r for endpoint in results.values() for r in endpoint], elapsed))
+            level["endpoints"] = {name: summarize(endpoint, elapsed) for name, endpoint in results.items()}
+            peaks = list(sampler.peaks.values())
+            level["rss_mb"] = {
+                "peak_per_worker": max(peaks) if peaks else None,
+                "peak_total": sum(peaks) if peaks else None,
+            }
+            summary["levels"].append(level)
+            print_level(level)
+    finally:
+        app.terminate()
+        app.wait()
+        stub.shutdown()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {args.json_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,9 @@ from fastapi import FastAPI, Request, Response
 import httpx
 import oai_server
 import re
+from profiling import profiled
 from metadata_provider import BASE_URL
-from utils import convert_to_dcat_ap, convert_to_dcat_ap_it, serialize_and_concatenate_graphs
-
-# Logging config
-logging.basicConfig(level=logging.DEBUG)
+from utils import convert_to_dcat_ap, convert_to_dcat_ap_it, serialize_and_concatenate_graphs, LogPreview
 
 # Initialize a FastAPI app to serve the OAI-PMH endpoint
 app = FastAPI()
@@ -24,6 +22,7 @@ def fetch_data(url):
 # Define OAI-PMH endpoint route
 @app.get("/oai/{dataset_id}")
 @app.post("/oai/{dataset_id}")
+@profiled
 def oai(request: Request, dataset_id: str):
     params = dict(request.query_params)
 
@@ -36,7 +35,7 @@ def oai(request: Request, dataset_id: str):
 
     # handleRequest points the request to the appropriate method in metadata_provider.py
     response = oai_server.oai_server.handleRequest(params)
-    logging.debug(f"OAI-PMH Response: {response}")
+    logging.debug("OAI-PMH Response: %s", LogPreview(response))
     # Replace date in datestamp by empty string
     response = re.sub(b'<datestamp>.*</datestamp>', b'', response)
     return Response(content=response, media_type="text/xml")
@@ -44,6 +43,7 @@ def oai(request: Request, dataset_id: str):
 # Define an endpoint for getting all the datasets
 @app.get("/oai")
 @app.post("/oai")
+@profiled
 def oai_all_datasets(request: Request):
     params = dict(request.query_params)
 
@@ -53,13 +53,14 @@ def oai_all_datasets(request: Request):
 
     # handleRequest points the request to the appropriate method in metadata_provider.py
     response = oai_server.oai_server.handleRequest(params)
-    logging.debug(f"OAI-PMH Response: {response}")
+    logging.debug("OAI-PMH Response: %s", LogPreview(response))
     # Replace date in datestamp by empty string
     response = re.sub(b'<datestamp>.*</datestamp>', b'', response)
     return Response(content=response, media_type="text/xml")
 
 # Endpoint for generating DCAT-AP IT catalog
 @app.get("/dcatapit")
+@profiled
 def dcatapit(request: Request):
     data = fetch_data(BASE_URL)
     #dcatap_graph = convert_to_dcat_ap(data, BASE_URL)
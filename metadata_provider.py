@@ -3,13 +3,12 @@ from datetime import datetime
 from lxml import etree
 from lxml.etree import Element
 import main
-from utils import convert_to_dcat_ap
+from utils import convert_to_dcat_ap, LogPreview
 import logging
+import os
 
-BASE_URL = "https://sebastien-datalake.cmcc.it/api/v2/datasets"
-
-# Logging config
-logging.basicConfig(level=logging.DEBUG)
+# Datalake endpoint, can be overridden with DATALAKE_URL (e.g. to point at the stub used by loadtest.py)
+BASE_URL = os.environ.get("DATALAKE_URL", "https://sebastien-datalake.cmcc.it/api/v2/datasets")
 
 # Each method in this class is a verb from the OAI-PMH protocol. Only listRecords is used by the data.europa harvester
 class MyMetadataProvider:
@@ -26,14 +25,14 @@ class MyMetadataProvider:
         data = main.fetch_data(
             dataset_url
         )
-        logging.debug(f"Fetched data: {data}")
+        logging.debug("Fetched data: %s", LogPreview(data))
 
         # Convert to RDF graph with proper DCAT-AP fields (URL is being used to fill the accessURL field)
         rdf_graph = convert_to_dcat_ap(data, dataset_url)
 
         # Serialize the RDF graph into a string, 'pretty-xml' format makes it more readable
         rdf_string = rdf_graph.serialize(format='pretty-xml')
-        logging.debug(f"RDF string: {rdf_string}")
+        logging.debug("RDF string: %s", LogPreview(rdf_string))
 
         # Create a header (mandatory for OAI-PMH)
         header_element = Element("header")
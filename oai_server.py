@@ -3,6 +3,7 @@ from oaipmh.metadata import MetadataRegistry, oai_dc_reader
 import metadata_provider
 from lxml.etree import fromstring, tostring
 import logging
+from utils import LogPreview
 
 # Function to write metadata in dcat_ap format (RDF/XML), otherwise it would use the default format (oai_dc) 
 def dcat_ap_writer(metadata_element, metadata):
@@ -11,7 +12,9 @@ def dcat_ap_writer(metadata_element, metadata):
     
     for child in rdf_element:
         metadata_element.append(child)
-        logging.debug(f"Metadata Element: {tostring(metadata_element, pretty_print=True).decode('utf-8')}")
+
+    # Serialized only if DEBUG is enabled, once the element is complete
+    logging.debug("Metadata Element: %s", LogPreview(lambda: tostring(metadata_element, pretty_print=True)))
 
 
 # Create reader for dcat_ap metadata
@@ -0,0 +1,155 @@
+import cProfile
+import functools
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+
+# Opt-in request profiling for live diagnosis, disabled unless configured through the environment:
+#   PROFILE_SAMPLE_RATE  fraction of /oai and /dcatapit requests to profile (0 to 1, default 0)
+#   PROFILE_TOKEN        enables on-demand profiling of requests sent with "X-Profile: <token>"
+#   PROFILE_DIR          where results are written (default: ./profiles)
+#   PROFILE_MAX_PROFILES profiles kept in PROFILE_DIR, the oldest are deleted (default 100, 0 keeps all)
+#   PROFILE_TRACEMALLOC  set to 0 to skip the tracemalloc snapshot. Tracing slows down every request handled by
+#                        the worker while a profile runs, and its statistics cover the whole process, not only
+#                        the profiled request. It is skipped if tracemalloc was already started elsewhere
+#   LOG_LEVEL            (utils.py) payload logging on the hot path only costs anything at DEBUG (default INFO)
+# Each profiled request writes <id>.prof (pstats format, render with e.g. `flameprof <id>.prof > <id>.svg`
+# or snakeviz) and <id>.mem.txt (top allocations), also when the request fails, and a successful response
+# carries the id in X-Profile-Id.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_PROFILES = int(os.environ.get("PROFILE_MAX_PROFILES", "100"))
+PROFILE_TRACEMALLOC = os.environ.get("PROFILE_TRACEMALLOC", "1") != "0"
+PROFILE_HEADER = "X-Profile"
+
+# Number of allocation sites written to the tracemalloc report
+TRACEMALLOC_TOP = 50
+
+# Result files written for each profile, the profile id is the file name without the suffix
+RESULT_SUFFIXES = (".prof", ".mem.txt")
+
+# tracemalloc is process wide (and from Python 3.12 so is cProfile), so only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+# Decide whether this request should be profiled (sampled, or requested with the right token)
+def should_profile(request):
+    if PROFILE_TOKEN and hmac.compare_digest(request.headers.get(PROFILE_HEADER, "").encode("utf-8"),
+                                             PROFILE_TOKEN.encode("utf-8")):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+# Delete the files of the oldest profiles so PROFILE_DIR keeps at most PROFILE_MAX_PROFILES of them.
+# Several workers can share PROFILE_DIR and prune at the same time, so files may vanish at any point
+def prune_results():
+    if PROFILE_MAX_PROFILES <= 0:
+        return
+    profiles = {}
+    for name in os.listdir(PROFILE_DIR):
+        suffix = next((suffix for suffix in RESULT_SUFFIXES if name.endswith(suffix)), None)
+        if suffix is None:
+            continue
+        path = os.path.join(PROFILE_DIR, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        profile = profiles.setdefault(name[:-len(suffix)], [0, []])
+        profile[0] = max(profile[0], mtime)
+        profile[1].append(path)
+
+    oldest = sorted(profiles.values(), key=lambda profile: profile[0])
+    for mtime, paths in oldest[:max(0, len(oldest) - PROFILE_MAX_PROFILES)]:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# Write the cProfile stats and the tracemalloc report of one request
+def write_results(profile_id, request, profiler, elapsed, error=None, snapshot=None, traced_peak=0, threads=1):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base_path = os.path.join(PROFILE_DIR, profile_id)
+    profiler.dump_stats(f"{base_path}.prof")
+    outcome = f"failed with {error!r}" if error is not None else "succeeded"
+
+    if snapshot is not None:
+        with open(f"{base_path}.mem.txt", "w") as f:
+            target = f"{request.url.path}?{request.url.query}" if request.url.query else request.url.path
+            f.write(f"{request.method} {target} took {elapsed * 1000:.1f} ms and {outcome}\n")
+            f.write(f"Allocations of the whole process during the request ({threads} threads active when it "
+                    f"started), not only of this request\n")
+            f.write(f"Peak traced memory: {traced_peak / 1024:.1f} KiB\n")
+            f.write(f"Top {TRACEMALLOC_TOP} allocation sites still alive at the end of the request:\n")
+            for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                f.write(f"{stat}\n")
+
+    logging.info("Profiled %s %s in %.1f ms (%s), results in %s.*", request.method, request.url.path,
+                 elapsed * 1000, outcome, base_path)
+
+
+# Decorator for (sync) endpoints taking a `request` argument, profiles the call when it is selected.
+# It runs inside the endpoint's worker thread, so the profile covers the actual request handling
+def profiled(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        request = kwargs["request"]
+        if not should_profile(request):
+            return endpoint(*args, **kwargs)
+        if not _profile_lock.acquire(blocking=False):
+            logging.info("Profiling busy, skipped %s %s", request.method, request.url.path)
+            return endpoint(*args, **kwargs)
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        # Only trace allocations (and stop tracing afterwards) if nobody else is tracing already
+        own_tracemalloc = PROFILE_TRACEMALLOC and not tracemalloc.is_tracing()
+        response, error, snapshot, traced_peak = None, None, None, 0
+        threads = threading.active_count()
+        try:
+            if own_tracemalloc:
+                tracemalloc.start()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = endpoint(*args, **kwargs)
+            except Exception as exc:
+                # Failed requests (e.g. datalake timeouts) are the ones worth diagnosing, keep their profile
+                error = exc
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                if own_tracemalloc:
+                    snapshot = tracemalloc.take_snapshot()
+                    traced_peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+        finally:
+            _profile_lock.release()
+
+        try:
+            write_results(profile_id, request, profiler, elapsed, error, snapshot, traced_peak, threads)
+        except OSError:
+            logging.exception("Could not write profiling results for %s", profile_id)
+            profile_id = None
+        else:
+            # The profile is already written, failing to prune must not hide it
+            try:
+                prune_results()
+            except OSError:
+                logging.warning("Could not prune %s", PROFILE_DIR, exc_info=True)
+
+        if error is not None:
+            raise error
+        if profile_id is not None:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+    return wrapper
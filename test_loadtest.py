@@ -0,0 +1,29 @@
+import argparse
+
+import pytest
+
+from loadtest import parse_mix, percentile
+
+
+def test_percentile_nearest_rank():
+    values = [1, 2, 3, 4, 5]
+    assert percentile(values, 50) == 3
+    assert percentile(values, 95) == 5
+    assert percentile(values, 99) == 5
+    assert percentile(values, 20) == 1
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_percentile_edge_cases():
+    assert percentile([], 50) is None
+    assert percentile([7], 99) == 7
+    assert percentile([1, 2], 0) == 1
+
+
+def test_parse_mix():
+    assert parse_mix("listrecords=5, Dataset=3,dcatapit") == {"listrecords": 5.0, "dataset": 3.0, "dcatapit": 1.0}
+
+
+def test_parse_mix_unknown_endpoint():
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("listrecords=1,getrecord=2")
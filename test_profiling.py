@@ -0,0 +1,123 @@
+import os
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+
+import profiling
+
+
+def make_request(headers=None):
+    return SimpleNamespace(headers=headers or {}, method="GET", url=SimpleNamespace(path="/oai", query=""))
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "s3cret")
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    return tmp_path
+
+
+def test_should_profile_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "s3cret")
+    assert profiling.should_profile(make_request({"X-Profile": "s3cret"}))
+    assert not profiling.should_profile(make_request({"X-Profile": "wrong"}))
+    assert not profiling.should_profile(make_request())
+    assert not profiling.should_profile(make_request({"X-Profile": "sécret"}))
+
+
+def test_should_profile_header_ignored_without_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    assert not profiling.should_profile(make_request({"X-Profile": ""}))
+
+
+def test_should_profile_sampling(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+    assert profiling.should_profile(make_request())
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.5)
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.7)
+    assert not profiling.should_profile(make_request())
+    monkeypatch.setattr(profiling.random, "random", lambda: 0.2)
+    assert profiling.should_profile(make_request())
+
+
+def test_profiled_writes_results(profile_dir):
+    endpoint = profiling.profiled(lambda request: Response(content=b"ok"))
+    response = endpoint(request=make_request({"X-Profile": "s3cret"}))
+    profile_id = response.headers["X-Profile-Id"]
+    assert sorted(os.listdir(profile_dir)) == [f"{profile_id}.mem.txt", f"{profile_id}.prof"]
+    report = (profile_dir / f"{profile_id}.mem.txt").read_text()
+    assert "whole process" in report
+    assert "Peak traced memory" in report
+
+
+def test_profiled_logs_when_busy(profile_dir, caplog):
+    endpoint = profiling.profiled(lambda request: Response(content=b"ok"))
+    with profiling._profile_lock, caplog.at_level("INFO"):
+        response = endpoint(request=make_request({"X-Profile": "s3cret"}))
+    assert "X-Profile-Id" not in response.headers
+    assert "Profiling busy" in caplog.text
+    assert os.listdir(profile_dir) == []
+
+
+def test_profiled_keeps_results_of_failed_requests(profile_dir):
+    def failing(request):
+        raise RuntimeError("datalake timeout")
+
+    with pytest.raises(RuntimeError, match="datalake timeout"):
+        profiling.profiled(failing)(request=make_request({"X-Profile": "s3cret"}))
+    (report,) = [name for name in os.listdir(profile_dir) if name.endswith(".mem.txt")]
+    assert "failed with RuntimeError('datalake timeout')" in (profile_dir / report).read_text()
+
+
+def test_profiled_leaves_foreign_tracemalloc_running(profile_dir):
+    tracemalloc.start()
+    try:
+        profiling.profiled(lambda request: Response())(request=make_request({"X-Profile": "s3cret"}))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def write_files(directory, names):
+    for i, name in enumerate(names):
+        path = directory / name
+        path.write_text("")
+        os.utime(path, (i, i))
+
+
+def test_prune_results_keeps_newest_profiles(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_PROFILES", 2)
+    write_files(profile_dir, ["a.prof", "a.mem.txt", "b.prof", "b.mem.txt", "c.prof", "c.mem.txt", "notes.txt"])
+    profiling.prune_results()
+    assert sorted(os.listdir(profile_dir)) == ["b.mem.txt", "b.prof", "c.mem.txt", "c.prof", "notes.txt"]
+
+
+def test_prune_results_skips_vanished_files(profile_dir, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_MAX_PROFILES", 1)
+    write_files(profile_dir, ["a.prof", "a.mem.txt", "b.prof", "b.mem.txt"])
+    getmtime = os.path.getmtime
+
+    # Another worker deletes a.mem.txt between listdir and getmtime
+    def racing_getmtime(path):
+        if path.endswith("a.mem.txt"):
+            os.remove(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(profiling.os.path, "getmtime", racing_getmtime)
+    profiling.prune_results()
+    assert sorted(os.listdir(profile_dir)) == ["b.mem.txt", "b.prof"]
+
+
+def test_profiled_keeps_id_when_pruning_fails(profile_dir, monkeypatch):
+    def failing_prune():
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr(profiling, "prune_results", failing_prune)
+    response = profiling.profiled(lambda request: Response())(request=make_request({"X-Profile": "s3cret"}))
+    assert f"{response.headers['X-Profile-Id']}.prof" in os.listdir(profile_dir)
@@ -0,0 +1,27 @@
+from utils import LogPreview
+
+
+def test_log_preview_short_value_unchanged():
+    assert str(LogPreview({"id": "pi"})) == "{'id': 'pi'}"
+
+
+def test_log_preview_truncates_long_values():
+    text = str(LogPreview("x" * 30, limit=10))
+    assert text == "x" * 10 + "... [20 more characters]"
+
+
+def test_log_preview_decodes_bytes():
+    assert str(LogPreview(b"<record>\xc3\xa0</record>")) == "<record>à</record>"
+
+
+def test_log_preview_callable_is_lazy():
+    calls = []
+
+    def render():
+        calls.append(1)
+        return b"abcdef"
+
+    preview = LogPreview(render, limit=3)
+    assert calls == []
+    assert str(preview) == "abc... [3 more characters]"
+    assert calls == [1]
@@ -2,6 +2,7 @@ import re
 from rdflib import Graph, Literal, Namespace, RDF, URIRef, BNode
 from rdflib.namespace import DCAT, DCTERMS, FOAF, RDF, XSD
 import logging
+import os
 from datetime import datetime
 
 # Dictionary with accrualPeriodicity values for somw known datasets
@@ -15,8 +16,28 @@ ACCRUAL_PERIODICITY = {
     "iot-environmental" : "IRREG"
 }
 
-# Logging config
-logging.basicConfig(level=logging.DEBUG)
+# Logging config, shared by all modules (utils is imported before any of them logs)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL)
+
+# Maximum number of characters of a payload written to the logs
+LOG_PREVIEW_LIMIT = int(os.environ.get("LOG_PREVIEW_LIMIT", "2000"))
+
+# Lazy, size-capped view of a payload for logging, it is only rendered if the record is actually emitted.
+# The value can be a callable, so expensive serializations are skipped when DEBUG is off
+class LogPreview:
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = LOG_PREVIEW_LIMIT if limit is None else limit
+
+    def __str__(self):
+        value = self.value() if callable(self.value) else self.value
+        if isinstance(value, bytes):
+            value = value.decode('utf-8', errors='replace')
+        text = str(value)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... [{len(text) - self.limit} more characters]"
+        return text
 
 # Namespaces for DCAT-AP, to be binded to the RDF graph
 DCAT = Namespace("http://www.w3.org/ns/dcat#")
@@ -97,7 +118,7 @@ class DatasetDCAT:
     def to_graph(self, g):
         dataset = URIRef(self.uri)
         g.add((dataset, RDF.type, DCAT.Dataset))
-        logging.debug(f"Adding to graph {g.identifier}: {dataset} a type {DCAT.Dataset}")
+        logging.debug("Adding to graph %s: %s a type %s", g.identifier, dataset, DCAT.Dataset)
 
         if self.title:
             g.add((dataset, DCTERMS.title, Literal(self.title)))